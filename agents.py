@@ -1,20 +1,36 @@
 """Google ADK Agent definitions - Weather, Document, Meeting Scheduler, and SQL Agents."""
 import os
+from functools import cache
 from google.adk import Agent
 from google.adk.tools import FunctionTool
 from tools import (
     get_weather,
     query_document,
     execute_sql,
+    execute_sql_batch,
     insert_meeting,
-    check_schedule_conflicts
+    check_schedule_conflicts,
+    prepare_meeting
 )
 
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY", "")
 MODEL_NAME = "gemini-2.5-flash"  # Updated to available model
 
+# Shared date-handling rules, referenced by every agent that works with dates
+DATE_RULES = """DATE HANDLING (calculate dates automatically - NEVER ask the user for a date or date format):
+- "today": CURRENT_DATE in SQL, otherwise today's date as YYYY-MM-DD
+- "tomorrow": CURRENT_DATE + INTERVAL '1 day' in SQL, otherwise today + 1 day as YYYY-MM-DD
+- "next week": CURRENT_DATE + INTERVAL '7 days' in SQL, otherwise today + 7 days as YYYY-MM-DD"""
+
+
+@cache
+def _tool(fn) -> FunctionTool:
+    """Wrap a tool function once, so its schema is introspected once per process."""
+    return FunctionTool(fn)
+
+
 # Weather Agent Tools
-weather_tool = FunctionTool(get_weather)
+weather_tool = _tool(get_weather)
 
 weather_agent = Agent(
     name="WeatherAgent",
@@ -24,7 +40,7 @@ weather_agent = Agent(
 )
 
 # Document + Web Intelligence Agent Tools
-doc_query_tool = FunctionTool(query_document)
+doc_query_tool = _tool(query_document)
 
 doc_agent = Agent(
     name="DocAgent",
@@ -50,46 +66,47 @@ Always provide a complete answer - either from the document OR from Google Searc
 )
 
 # SQL Agent Tools
-sql_tool = FunctionTool(execute_sql)
+sql_tool = _tool(execute_sql)
+sql_batch_tool = _tool(execute_sql_batch)
 
 sql_agent = Agent(
     name="SQLAgent",
     model=MODEL_NAME,
-    tools=[sql_tool],
-    instruction="""You are an NL2SQL agent. Convert natural language queries to PostgreSQL SQL queries for the meetings table.
+    tools=[sql_tool, sql_batch_tool],
+    instruction=f"""You are an NL2SQL agent. Convert natural language queries to PostgreSQL SQL queries for the meetings table.
     The meetings table has columns: id, title, meeting_date, meeting_time, reasoning, created_at.
     
-    IMPORTANT DATE HANDLING:
-    - When user says "tomorrow": Calculate tomorrow's date as CURRENT_DATE + INTERVAL '1 day' OR use date format (YYYY-MM-DD)
-    - When user says "today": Use CURRENT_DATE
-    - When user says "next week": Use CURRENT_DATE + INTERVAL '7 days'
-    - Always calculate dates automatically - NEVER ask the user for date format
+{DATE_RULES}
     
     DATE EXAMPLES:
     - "Show all meetings scheduled tomorrow" → SELECT * FROM meetings WHERE meeting_date = CURRENT_DATE + INTERVAL '1 day';
     - "Do we have any meetings today?" → SELECT * FROM meetings WHERE meeting_date = CURRENT_DATE;
     - "List meetings next week" → SELECT * FROM meetings WHERE meeting_date >= CURRENT_DATE + INTERVAL '7 days' AND meeting_date < CURRENT_DATE + INTERVAL '14 days';
     
-    Always use SELECT queries only. Return results in a clear, formatted way. Calculate dates automatically using PostgreSQL date functions."""
+    If the user asks multiple related questions, submit them together via execute_sql_batch instead of calling execute_sql repeatedly.
+    
+    Always use SELECT queries only. Return results in a clear, formatted way."""
 )
 
 # Meeting Scheduler Agent Tools
-check_conflicts_tool = FunctionTool(check_schedule_conflicts)
-insert_meeting_tool = FunctionTool(insert_meeting)
+check_conflicts_tool = _tool(check_schedule_conflicts)
+insert_meeting_tool = _tool(insert_meeting)
+prepare_meeting_tool = _tool(prepare_meeting)
 
 meeting_agent = Agent(
     name="MeetingAgent",
     model=MODEL_NAME,
-    tools=[check_conflicts_tool, insert_meeting_tool, weather_tool],
-    instruction="""You are a meeting scheduler agent with multi-step reasoning capabilities.
+    tools=[prepare_meeting_tool, insert_meeting_tool],
+    instruction=f"""You are a meeting scheduler agent with multi-step reasoning capabilities.
+
+{DATE_RULES}
 
     Workflow:
-    1. First, use get_weather tool to check tomorrow's weather forecast for the user's city.
+    1. First, use prepare_meeting with the user's city and the requested date/time. It returns the weather forecast and the scheduling conflicts together.
     2. Apply logic: If weather is clear or clouds AND temperature > 18°C, then is_weather_good = True.
-    3. If is_weather_good is True:
-       a. Use check_schedule_conflicts to check for conflicts on the requested date/time.
-       b. If no conflicts, use insert_meeting to schedule the meeting.
-       c. Include reasoning in the format: "Weather: [condition], [temperature]C"
+    3. If is_weather_good is True and there are no conflicts:
+       a. Use insert_meeting to schedule the meeting.
+       b. Include reasoning in the format: "Weather: [condition], [temperature]C"
     4. If weather is not good or conflicts exist, inform the user.
 
     Always use multi-step reasoning and coordinate tools as needed."""
@@ -97,29 +114,26 @@ meeting_agent = Agent(
 
 # Root Agent (Supervisor) - Routes to appropriate agent
 # For multi-agent coordination, use a single agent with all tools
-all_tools = [weather_tool, doc_query_tool, sql_tool, check_conflicts_tool, insert_meeting_tool]
+all_tools = [
+    _tool(fn) for fn in (
+        get_weather, query_document, execute_sql, execute_sql_batch,
+        check_schedule_conflicts, insert_meeting, prepare_meeting
+    )
+]
 
 root_agent = Agent(
     name="Supervisor",
     model=MODEL_NAME,
     tools=all_tools,
-    instruction="""You are the supervisor coordinating specialized agent capabilities:
+    instruction=f"""You are the supervisor coordinating specialized agent capabilities:
     - Weather queries: Use get_weather tool directly
-    - Document queries: Use query_document tool. For general knowledge questions (like "Who is Google CEO?"), use Gemini's built-in Google Search grounding
-    - Meeting scheduling: Use get_weather, check_schedule_conflicts, and insert_meeting tools
-    - Database queries: Use execute_sql tool (read-only SELECT queries)
+    - Document queries: Use query_document tool. For general knowledge questions (like "Who is Google CEO?") or information not in documents, use Gemini's built-in Google Search grounding
+    - Meeting scheduling: check weather and conflicts together (prepare_meeting) → schedule if conditions are met (insert_meeting). If city is not specified, use "Chennai" as default.
+    - Database queries: Use execute_sql tool (read-only SELECT queries); for several related queries in one question, use execute_sql_batch once
     
     Route user queries to the appropriate tool(s) and coordinate multi-step workflows when needed.
     
-    IMPORTANT INSTRUCTIONS:
-    - For dates: When user says "tomorrow", calculate automatically - NEVER ask for date format
-      * For SQL queries: Use PostgreSQL date functions (CURRENT_DATE + INTERVAL '1 day')
-      * For other queries: Calculate as today + 1 day in YYYY-MM-DD format
-    - For meeting scheduling: If city is not specified, use "Chennai" as default. Calculate tomorrow's date automatically.
-    - For SQL queries: Use PostgreSQL date functions for date calculations - do NOT ask user for date format
-    - For general knowledge questions not in documents: Use Gemini's built-in Google Search grounding capability
-    - Be proactive: Don't ask for information you can infer or calculate - calculate dates automatically
-    - Always provide complete answers - if a tool fails, explain clearly and suggest alternatives
+{DATE_RULES}
     
-    For meeting scheduling, follow the workflow: check weather → check conflicts → schedule if conditions are met."""
+    Be proactive: don't ask for information you can infer or calculate. Always provide complete answers - if a tool fails, explain clearly and suggest alternatives."""
 )
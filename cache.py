@@ -0,0 +1,234 @@
+"""Response caches for tool calls - exact-match LRU and semantic (FAISS) layers."""
+import asyncio
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+from collections import Counter, OrderedDict
+from functools import wraps
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+# The semantic layer is optional: it needs faiss-cpu and sentence-transformers.
+# Without them only the exact-match layer is used.
+try:
+    import faiss
+    import numpy as np
+    from sentence_transformers import SentenceTransformer
+except ImportError:
+    faiss = None
+
+EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+SEMANTIC_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.92"))
+DOC_CACHE_PATH = os.getenv("DOC_CACHE_PATH", "doc_cache.db")
+# The sidecar file is shared by all worker processes: WAL lets them read while one
+# writes, and busy_timeout waits for a lock instead of failing straight away
+DOC_CACHE_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA busy_timeout=5000",
+)
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_query(query: str) -> str:
+    """Lowercase, collapse whitespace and strip surrounding punctuation so trivially different queries share a key."""
+    return _WHITESPACE_RE.sub(" ", query.lower()).strip(" .?!")
+
+
+def cache_key(*parts: Any) -> str:
+    """Build a stable sha1 cache key from the given parts."""
+    return hashlib.sha1("\0".join(str(p) for p in parts).encode("utf-8")).hexdigest()
+
+
+class ExactCache:
+    """Bounded LRU mapping of cache keys to answers."""
+
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self._data: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            if key not in self._data:
+                return None
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def set(self, key: str, value: str) -> None:
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+class SemanticCache:
+    """
+    Nearest-neighbour cache over previously answered queries.
+
+    Queries are embedded with a small sentence-transformers model and looked up
+    in a FAISS inner-product index (cosine similarity on L2-normalized vectors).
+    Entries are stamped with the document version and persisted in a sidecar
+    sqlite file, so the index is rebuilt from disk on restart and entries for
+    an older version of the document are dropped.
+    """
+
+    def __init__(self, db_path: str = DOC_CACHE_PATH, threshold: float = SEMANTIC_THRESHOLD):
+        self.db_path = db_path
+        self.threshold = threshold
+        self.enabled = faiss is not None
+        self._model = None
+        self._index = None
+        self._answers: list = []
+        self._stamp: Optional[str] = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path)
+        for pragma in DOC_CACHE_PRAGMAS:
+            conn.execute(pragma)
+        return conn
+
+    def _embed(self, text: str):
+        if self._model is None:
+            try:
+                self._model = SentenceTransformer(EMBEDDING_MODEL)
+            except Exception:
+                # The model can't be loaded, so stop trying for the rest of the process
+                self.enabled = False
+                raise
+        vector = self._model.encode([text], normalize_embeddings=True)
+        return np.asarray(vector, dtype="float32")
+
+    def _load(self, stamp: str) -> None:
+        """Rebuild the in-memory index for the given document stamp."""
+        dim = self._model.get_sentence_embedding_dimension()
+        index = faiss.IndexFlatIP(dim)
+        answers = []
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS semantic_cache "
+                    "(stamp TEXT NOT NULL, query TEXT NOT NULL, embedding BLOB NOT NULL, answer TEXT NOT NULL)"
+                )
+                conn.execute("DELETE FROM semantic_cache WHERE stamp != ?", (stamp,))
+                rows = conn.execute(
+                    "SELECT embedding, answer FROM semantic_cache WHERE stamp = ?", (stamp,)
+                ).fetchall()
+        finally:
+            conn.close()
+        if rows:
+            index.add(np.vstack([np.frombuffer(blob, dtype="float32") for blob, _ in rows]))
+            answers = [answer for _, answer in rows]
+        self._index, self._answers, self._stamp = index, answers, stamp
+
+    def lookup(self, query: str, stamp: str) -> Tuple[Optional[str], Any]:
+        """Return (answer or None, query embedding) for the closest cached query."""
+        with self._lock:
+            vector = self._embed(query)
+            if self._stamp != stamp:
+                self._load(stamp)
+            if self._index.ntotal == 0:
+                return None, vector
+            scores, ids = self._index.search(vector, 1)
+            if scores[0][0] >= self.threshold:
+                return self._answers[ids[0][0]], vector
+            return None, vector
+
+    def store(self, query: str, stamp: str, answer: str, vector) -> None:
+        """Add an answered query to the index and the sidecar file."""
+        with self._lock:
+            if self._stamp != stamp:
+                self._load(stamp)
+            self._index.add(vector)
+            self._answers.append(answer)
+            conn = self._connect()
+            try:
+                with conn:
+                    conn.execute(
+                        "INSERT INTO semantic_cache (stamp, query, embedding, answer) VALUES (?, ?, ?, ?)",
+                        (stamp, query, vector.tobytes(), answer)
+                    )
+            finally:
+                conn.close()
+
+
+exact_cache = ExactCache(maxsize=1024)
+semantic_cache = SemanticCache()
+# Lookup outcomes for the document cache in this process: exact_hits, semantic_hits, misses
+_stats: Counter = Counter()
+
+
+def document_cache_stats() -> Dict[str, Any]:
+    """Return hit/miss counts and the hit rate of the document cache in this process."""
+    hits = _stats["exact_hits"] + _stats["semantic_hits"]
+    lookups = hits + _stats["misses"]
+    return {
+        "exact_hits": _stats["exact_hits"],
+        "semantic_hits": _stats["semantic_hits"],
+        "misses": _stats["misses"],
+        "hit_rate": round(hits / lookups, 3) if lookups else 0.0
+    }
+
+
+def cached_document_query(resolve_source: Callable[[], Optional[str]]):
+    """
+    Cache answers of an async document query function.
+
+    Answers are keyed by the normalized query and the source file's mtime, so
+    updating the document invalidates every entry made against the old version.
+    Error responses are never cached. Embedding work for the semantic layer
+    runs in a worker thread so it doesn't block the event loop.
+
+    Args:
+        resolve_source: Returns the path of the document being queried, or None
+    """
+    def decorator(fn: Callable[[str], Awaitable[str]]) -> Callable[[str], Awaitable[str]]:
+        @wraps(fn)
+        async def wrapper(query: str) -> str:
+            source = resolve_source()
+            if source is None:
+                return await fn(query)
+            stamp = f"{source}:{os.path.getmtime(source)}"
+            normalized = normalize_query(query)
+            key = cache_key(normalized, stamp)
+
+            answer = exact_cache.get(key)
+            if answer is not None:
+                _stats["exact_hits"] += 1
+                return answer
+
+            vector = None
+            if semantic_cache.enabled:
+                try:
+                    answer, vector = await asyncio.to_thread(semantic_cache.lookup, normalized, stamp)
+                except Exception as e:
+                    # Usually transient (e.g. the sidecar file is locked by another worker),
+                    # so only this call skips the semantic layer
+                    print(f"⚠️  Semantic cache lookup skipped: {e}")
+                    answer, vector = None, None
+                if answer is not None:
+                    _stats["semantic_hits"] += 1
+                    exact_cache.set(key, answer)
+                    return answer
+
+            _stats["misses"] += 1
+            answer = await fn(query)
+            if answer.startswith("Error"):
+                return answer
+            exact_cache.set(key, answer)
+            if semantic_cache.enabled and vector is not None:
+                try:
+                    await asyncio.to_thread(semantic_cache.store, normalized, stamp, answer, vector)
+                except Exception as e:
+                    print(f"⚠️  Failed to persist semantic cache entry: {e}")
+            return answer
+        return wrapper
+    return decorator
@@ -13,8 +13,7 @@ CREATE TABLE IF NOT EXISTS meetings (
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
--- Create index on meeting_date for faster queries
-CREATE INDEX IF NOT EXISTS idx_meeting_date ON meetings(meeting_date);
-
--- Create index on meeting_date and meeting_time for conflict checking
-CREATE INDEX IF NOT EXISTS idx_meeting_datetime ON meetings(meeting_date, meeting_time);
+-- Covering index on meeting_date and meeting_time for conflict checking (index-only scans).
+-- It also serves meeting_date-only lookups. reasoning is unbounded TEXT, so it is left out:
+-- long values would exceed the btree row size limit and fail the insert.
+CREATE INDEX IF NOT EXISTS ix_meetings_date_time ON meetings(meeting_date, meeting_time) INCLUDE (id, title);
@@ -1,30 +1,70 @@
 """FastAPI application with Google ADK Agents."""
+import io
 import os
-from typing import Optional
+from contextlib import asynccontextmanager
+from typing import List, Optional
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from google.adk import Runner
 from google.adk.sessions.sqlite_session_service import SqliteSessionService
 import google.genai as genai
 from agents import root_agent
 from database import create_tables
+from cache import document_cache_stats
+from tools import close_connections, get_document_batch, submit_document_batch
 
-# Create database tables on startup (optional - will fail gracefully if DB not available)
-try:
-    create_tables()
-    print("✅ Database connection successful")
-except Exception as e:
-    print(f"⚠️  Database connection failed (will retry when needed): {e}")
+# Per-connection SQLite settings for the session store: WAL lets readers run alongside
+# the writer, and synchronous=NORMAL only fsyncs at checkpoints instead of every commit
+SESSION_DB_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA mmap_size=268435456",
+    "PRAGMA busy_timeout=5000",
+)
+
+
+class TunedSqliteSessionService(SqliteSessionService):
+    """SqliteSessionService that applies SESSION_DB_PRAGMAS to every connection it opens."""
+
+    @asynccontextmanager
+    async def _get_db_connection(self):
+        # The base service opens a new connection per operation, so the pragmas
+        # that are not persisted in the file must be applied each time
+        async with super()._get_db_connection() as db:
+            for pragma in SESSION_DB_PRAGMAS:
+                await db.execute(pragma)
+            yield db
 
-# Create session service once (reused across requests)
-session_service = SqliteSessionService(db_path='sessions.db')
 
-# Create global Runner instance (singleton - reused across all requests)
 APP_NAME = 'agentic_workflow'
-runner = Runner(agent=root_agent, app_name=APP_NAME, session_service=session_service)
 
-app = FastAPI(title="Agentic AI Workflow API", version="1.0.0")
+# Session service and Runner are created once per worker process in lifespan
+# (reused across all requests in that worker)
+session_service: Optional[TunedSqliteSessionService] = None
+runner: Optional[Runner] = None
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Create per-worker services and database tables on startup; close shared clients and pools on shutdown."""
+    global session_service, runner
+    session_service = TunedSqliteSessionService(db_path='sessions.db')
+    runner = Runner(agent=root_agent, app_name=APP_NAME, session_service=session_service)
+    
+    # Create database tables (optional - will fail gracefully if DB not available)
+    try:
+        await create_tables()
+        print("✅ Database connection successful")
+    except Exception as e:
+        print(f"⚠️  Database connection failed (will retry when needed): {e}")
+    yield
+    await close_connections()
+
+
+app = FastAPI(title="Agentic AI Workflow API", version="1.0.0", lifespan=lifespan)
 
 # CORS middleware
 app.add_middleware(
@@ -49,6 +89,40 @@ class ChatResponse(BaseModel):
     session_id: Optional[str] = None
 
 
+class DocumentBatchRequest(BaseModel):
+    """Document batch request model."""
+    queries: List[str]
+
+
+def _extract_text(event) -> str:
+    """Return the text carried by an ADK event ('' for tool calls and other non-text events)."""
+    content = event.content
+    # Fast path: ADK events carry a genai Content whose parts are Part objects
+    if isinstance(content, genai.types.Content):
+        return ''.join(part.text for part in content.parts or () if part.text)
+    return _extract_text_fallback(content)
+
+
+def _extract_text_fallback(content) -> str:
+    """Cold path for event payloads that are not a genai Content (strings, dicts, other objects)."""
+    if content is None:
+        return ''
+    if isinstance(content, str):
+        return content
+    parts = getattr(content, 'parts', None)
+    if parts:
+        texts = []
+        for part in parts:
+            if isinstance(part, str):
+                texts.append(part)
+            elif isinstance(part, dict):
+                texts.append(part.get('text') or '')
+            else:
+                texts.append(getattr(part, 'text', None) or '')
+        return ''.join(texts)
+    return getattr(content, 'text', None) or ''
+
+
 @app.get("/")
 async def root():
     """Root endpoint."""
@@ -62,8 +136,45 @@ async def root():
 
 @app.get("/health")
 async def health():
-    """Health check endpoint."""
-    return {"status": "healthy"}
+    """Health check endpoint (includes this worker's document cache hit rate)."""
+    return {"status": "healthy", "document_cache": document_cache_stats()}
+
+
+async def _ensure_session(user_id: str, session_id: str) -> None:
+    """Explicitly Check/Create Session (Get or Create Pattern)."""
+    # Try to retrieve existing session (returns None if not found)
+    existing_session = await session_service.get_session(
+        app_name=APP_NAME,
+        user_id=user_id,
+        session_id=session_id
+    )
+    
+    if existing_session is None:
+        # Session doesn't exist, create it in the SQLite DB
+        await session_service.create_session(
+            app_name=APP_NAME,
+            user_id=user_id,
+            session_id=session_id
+        )
+
+
+async def _run_agent(user_id: str, session_id: str, message: str):
+    """Run the root agent and yield response text as each event arrives."""
+    # Create Content object for the message
+    user_message = genai.types.Content(
+        role='user',
+        parts=[genai.types.Part(text=message)]
+    )
+    
+    # Run the agent asynchronously (Runner is global singleton)
+    async for event in runner.run_async(
+        user_id=user_id,
+        session_id=session_id,
+        new_message=user_message
+    ):
+        part_text = _extract_text(event)
+        if part_text:
+            yield part_text
 
 
 @app.post("/chat", response_model=ChatResponse)
@@ -82,94 +193,18 @@ async def chat(request: ChatRequest):
         user_id = request.user_id or "default_user"
         session_id = request.session_id or "default_session"
         
-        # Step 2: Explicitly Check/Create Session (Get or Create Pattern)
-        # Try to retrieve existing session (returns None if not found)
-        existing_session = await session_service.get_session(
-            app_name=APP_NAME,
-            user_id=user_id,
-            session_id=session_id
-        )
+        # Step 2: Get or create the session
+        await _ensure_session(user_id, session_id)
         
-        if existing_session is None:
-            # Session doesn't exist, create it in the SQLite DB
-            await session_service.create_session(
-                app_name=APP_NAME,
-                user_id=user_id,
-                session_id=session_id
-            )
+        # Step 3: Run the agent and collect the response (space-separated, stripped once at the end)
+        buf = io.StringIO()
+        async for part_text in _run_agent(user_id, session_id, request.message):
+            if buf.tell():
+                buf.write(" ")
+            buf.write(part_text)
         
-        # Step 3: Create Content object for the message
-        user_message = genai.types.Content(
-            role='user',
-            parts=[genai.types.Part(text=request.message)]
-        )
-        
-        # Step 4: Run the agent asynchronously (Runner is global singleton)
-        response_parts = []
-        event_count = 0
-        async for event in runner.run_async(
-            user_id=user_id,
-            session_id=session_id,
-            new_message=user_message
-        ):
-            event_count += 1
-            
-            # Collect response from events - try multiple ways to extract text
-            text_found = False
-            
-            # Method 1: Check event.content (Content object)
-            if hasattr(event, 'content') and event.content:
-                # If content is a string
-                if isinstance(event.content, str):
-                    response_parts.append(event.content)
-                    text_found = True
-                # If content has parts attribute
-                elif hasattr(event.content, 'parts') and event.content.parts:
-                    for part in event.content.parts:
-                        # Part can be Part object with .text attribute
-                        try:
-                            part_text = getattr(part, 'text', None)
-                            if part_text:
-                                response_parts.append(str(part_text).strip())
-                                text_found = True
-                                continue
-                        except:
-                            pass
-                        # Or part can be a string
-                        if isinstance(part, str) and part.strip():
-                            response_parts.append(part.strip())
-                            text_found = True
-                            continue
-                        # Or part can be a dict
-                        if isinstance(part, dict) and 'text' in part:
-                            part_text = part['text']
-                            if part_text:
-                                response_parts.append(str(part_text).strip())
-                                text_found = True
-                                continue
-                # If content has text attribute directly
-                elif hasattr(event.content, 'text'):
-                    response_parts.append(str(event.content.text))
-                    text_found = True
-            
-            # Method 2: Check event.text directly
-            if not text_found and hasattr(event, 'text') and event.text:
-                response_parts.append(str(event.text))
-                text_found = True
-            
-            # Method 3: Try string conversion if nothing else works
-            if not text_found and event_count == 1:
-                # For first event, try to extract any readable text
-                event_str = str(event)
-                if len(event_str) < 500:  # Only if reasonable size
-                    # Try to find text patterns
-                    if 'text' in event_str.lower():
-                        response_parts.append(event_str)
-        
-        # Join all response parts
-        if response_parts:
-            response_text = " ".join(response_parts).strip()
-        else:
+        response_text = buf.getvalue().strip()
+        if not response_text:
             response_text = "No response received. The agent may be taking longer than expected or encountered an error."
         
         return ChatResponse(
@@ -180,8 +215,70 @@ async def chat(request: ChatRequest):
         raise HTTPException(status_code=500, detail=f"Error processing request: {str(e)}")
 
 
+@app.post("/chat/stream")
+async def chat_stream(request: ChatRequest) -> StreamingResponse:
+    """
+    Streaming variant of /chat.
+    
+    Returns the agent's response as plain text, sending each message as soon as
+    the agent produces it instead of waiting for the whole workflow to finish.
+    """
+    user_id = request.user_id or "default_user"
+    session_id = request.session_id or "default_session"
+    
+    try:
+        await _ensure_session(user_id, session_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error processing request: {str(e)}")
+    
+    async def body():
+        first = True
+        try:
+            async for part_text in _run_agent(user_id, session_id, request.message):
+                yield (part_text if first else " " + part_text).encode()
+                first = False
+        except Exception as e:
+            # Headers are already sent, so report the error in the body
+            yield f"\nError processing request: {str(e)}".encode()
+    
+    return StreamingResponse(body(), media_type="text/plain; charset=utf-8")
+
+
+@app.post("/documents/batch")
+async def create_document_batch(request: DocumentBatchRequest):
+    """
+    Submit document questions as a Gemini Batch Mode job (offline, ~50% cheaper).
+    
+    Returns the job name to poll with GET /documents/batch/{job_name}.
+    """
+    result = await submit_document_batch(request.queries)
+    if "error" in result:
+        raise HTTPException(status_code=500, detail=result["error"])
+    return result
+
+
+@app.get("/documents/batch/{job_name:path}")
+async def read_document_batch(job_name: str):
+    """Get a document batch job's state, and its answers once it has succeeded."""
+    result = await get_document_batch(job_name)
+    if "error" in result:
+        raise HTTPException(status_code=500, detail=result["error"])
+    return result
+
+
 if __name__ == "__main__":
-    import uvicorn
+    import sys
     
     port = int(os.getenv("PORT", 8000))
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    workers = int(os.getenv("WEB_CONCURRENCY", os.cpu_count() or 1))
+    # Workers inherit the environment; database.py splits the connection budget across them
+    os.environ["WEB_CONCURRENCY"] = str(workers)
+    # Hand over to the uvicorn CLI instead of uvicorn.run(): spawned workers would otherwise
+    # re-import this module (agents, tools, google-adk) before answering the supervisor's
+    # 5s health ping, and get killed and restarted forever. Each worker builds its own
+    # Runner and DB pool when it loads main:app.
+    os.execv(sys.executable, [
+        sys.executable, "-m", "uvicorn", "main:app",
+        "--host", "0.0.0.0", "--port", str(port), "--workers", str(workers),
+        "--loop", "uvloop", "--http", "httptools"
+    ])
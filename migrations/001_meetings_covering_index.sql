@@ -0,0 +1,10 @@
+-- Covering index for check_schedule_conflicts on existing databases
+-- Run outside a transaction (CONCURRENTLY does not block writes):
+-- psql -U postgres -d meetings_db -f migrations/001_meetings_covering_index.sql
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_meetings_date_time
+    ON meetings(meeting_date, meeting_time) INCLUDE (id, title);
+
+-- Superseded by ix_meetings_date_time (its leading columns serve the same lookups)
+DROP INDEX CONCURRENTLY IF EXISTS idx_meeting_datetime;
+DROP INDEX CONCURRENTLY IF EXISTS idx_meeting_date;
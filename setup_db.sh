@@ -21,8 +21,7 @@ CREATE TABLE IF NOT EXISTS meetings (
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
-CREATE INDEX IF NOT EXISTS idx_meeting_date ON meetings(meeting_date);
-CREATE INDEX IF NOT EXISTS idx_meeting_datetime ON meetings(meeting_date, meeting_time);
+CREATE INDEX IF NOT EXISTS ix_meetings_date_time ON meetings(meeting_date, meeting_time) INCLUDE (id, title);
 EOF
 }
 